@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import time
@@ -17,6 +18,7 @@ from tenacity import before_sleep_log, retry, stop_after_attempt
 from threadmem import RoleMessage, RoleThread
 from toolfuse.util import AgentUtils
 
+from .img import image_to_b64
 from .tool import SemanticDesktop, router
 
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +27,8 @@ logger.setLevel(int(os.getenv("LOG_LEVEL", str(logging.DEBUG))))
 
 console = Console(force_terminal=True)
 
+_ACTION_SCHEMA_JSON = json.dumps(V1ActionSelection.model_json_schema())
+
 
 class SurfSlicerConfig(BaseModel):
     pass
@@ -65,80 +69,82 @@ class SurfSlicer(TaskAgent):
         # Wrap the standard desktop in our special tool
         semdesk = SemanticDesktop(task=task, desktop=device)
 
-        # Add standard agent utils to the device
-        semdesk.merge(AgentUtils())
-
-        # Open a site if present in the parameters
-        site = task._parameters.get("site") if task._parameters else None
-        if site:
-            console.print(f"▶️ opening site url: {site}", style="blue")
-            task.post_message("assistant", f"opening site url {site}...")
-            semdesk.desktop.open_url(site)
-            console.print("waiting for browser to open...", style="blue")
-            time.sleep(5)
-
-        # Get info about the desktop
-        info = semdesk.desktop.info()
-        screen_size = info["screen_size"]
-        console.print(f"Screen size: {screen_size}")
-
-        # Get the json schema for the tools, excluding actions that aren't useful
-        tools = semdesk.json_schema(
-            exclude_names=[
-                "move_mouse",
-                "click",
-                "drag_mouse",
-                "mouse_coordinates",
-                "take_screenshots",
-                "open_url",
-                "double_click",
-            ]
-        )
-        console.print("tools: ", style="purple")
-        console.print(JSON.from_data(tools))
-
-        # Create our thread and start with a system prompt
-        thread = RoleThread()
-        thread.post(
-            role="user",
-            msg=(
-                "You are an AI assistant which uses devices to accomplish tasks. "
-                f"Your current task is {task.description}, and your available tools are {tools} "
-                "For each screenshot I will send you please return the result chosen action as a "
-                f"raw JSON adhearing to the schema {V1ActionSelection.model_json_schema()} "
-                "Let me know when you are ready and I'll send you the first screenshot. "
-            ),
-        )
-        response = router.chat(thread, namespace="system")
-        console.print(f"system prompt response: {response}", style="blue")
-        thread.add_msg(response.msg)
-
-        # Loop to run actions
-        for i in range(max_steps):
-            console.print(f"-------step {i + 1}", style="green")
-
-            try:
-                thread, done = self.take_action(semdesk, task, thread)
-            except Exception as e:
-                console.print(f"Error: {e}", style="red")
-                task.status = TaskStatus.FAILED
-                task.error = str(e)
-                task.save()
-                task.post_message("assistant", f"❗ Error taking action: {e}")
-                return task
+        try:
+            # Add standard agent utils to the device
+            semdesk.merge(AgentUtils())
+
+            # Open a site if present in the parameters
+            site = task._parameters.get("site") if task._parameters else None
+            if site:
+                console.print(f"▶️ opening site url: {site}", style="blue")
+                task.post_message("assistant", f"opening site url {site}...")
+                semdesk.desktop.open_url(site)
+                console.print("waiting for browser to open...", style="blue")
+                time.sleep(5)
+
+            # Get info about the desktop
+            info = semdesk.desktop.info()
+            screen_size = info["screen_size"]
+            console.print(f"Screen size: {screen_size}")
+
+            # Get the json schema for the tools, excluding actions that aren't useful
+            tools = semdesk.json_schema(
+                exclude_names=[
+                    "move_mouse",
+                    "click",
+                    "drag_mouse",
+                    "mouse_coordinates",
+                    "take_screenshots",
+                    "open_url",
+                    "double_click",
+                ]
+            )
+            console.print("tools: ", style="purple")
+            console.print(JSON.from_data(tools))
 
-            if done:
-                console.print("task is done", style="green")
-                return task
+            # Create our thread and start with a system prompt
+            thread = RoleThread()
+            thread.post(
+                role="user",
+                msg=(
+                    "You are an AI assistant which uses devices to accomplish tasks. "
+                    f"Your current task is {task.description}, and your available tools are {tools} "
+                    "For each screenshot I will send you please return the result chosen action as a "
+                    f"raw JSON adhearing to the schema {_ACTION_SCHEMA_JSON} "
+                    "Let me know when you are ready and I'll send you the first screenshot. "
+                ),
+            )
+            response = router.chat(thread, namespace="system")
+            console.print(f"system prompt response: {response}", style="blue")
+            thread.add_msg(response.msg)
+
+            # Loop to run actions
+            for i in range(max_steps):
+                console.print(f"-------step {i + 1}", style="green")
+
+                try:
+                    thread, done = self.take_action(semdesk, task, thread)
+                except Exception as e:
+                    console.print(f"Error: {e}", style="red")
+                    task.status = TaskStatus.FAILED
+                    task.error = str(e)
+                    task.save()
+                    task.post_message("assistant", f"❗ Error taking action: {e}")
+                    return task
 
-            time.sleep(2)
+                if done:
+                    console.print("task is done", style="green")
+                    return task
 
-        task.status = TaskStatus.FAILED
-        task.save()
-        task.post_message("assistant", "❗ Max steps reached without solving task")
-        console.print("Reached max steps without solving task", style="red")
+            task.status = TaskStatus.FAILED
+            task.save()
+            task.post_message("assistant", "❗ Max steps reached without solving task")
+            console.print("Reached max steps without solving task", style="red")
 
-        return task
+            return task
+        finally:
+            # flush the debug messages and release the worker threads, however we got here
+            semdesk.close()
 
     @retry(
         stop=stop_after_attempt(5),
@@ -181,12 +187,14 @@ class SurfSlicer(TaskAgent):
             _thread = thread.copy()
             _thread.remove_images()
 
-            # Take a screenshot of the desktop and post a message with it
+            # Take a screenshot of the desktop and post a message with it; it is encoded
+            # once here and the same string is handed to every consumer below
             screenshot_img = semdesk.desktop.take_screenshots()[0]
+            screenshot_b64 = image_to_b64(screenshot_img)
             task.post_message(
                 "assistant",
                 "current image",
-                images=[screenshot_img],
+                images=[screenshot_b64],
                 thread="debug",
             )
 
@@ -206,7 +214,7 @@ class SurfSlicer(TaskAgent):
                     "focus on the input field first by clicking on it. "
                     "Please return just the raw JSON."
                 ),
-                images=[screenshot_img],
+                images=[screenshot_b64],
             )
             _thread.add_msg(msg)
 
@@ -272,7 +280,7 @@ class SurfSlicer(TaskAgent):
 
             # Record the action for feedback and tuning
             task.record_action(
-                EnvState(images=[screenshot_img]),
+                EnvState(images=[screenshot_b64]),
                 prompt=response.prompt,
                 action=selection.action,
                 tool=semdesk.ref(),
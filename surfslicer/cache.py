@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import NamedTuple, Optional, Type, TypeVar
+
+from PIL import Image
+from pydantic import BaseModel
+
+from .img import dhash
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class CacheKey(NamedTuple):
+    """Hashes identifying a prompt and image in the cache"""
+
+    key: str
+    prompt_hash: str
+    image_hash: int
+
+
+class ResponseCache:
+    """A cache of parsed model responses keyed on the prompt and the image contents.
+
+    Exact matches are looked up by key. Optionally, the most recent entry for the same prompt
+    whose perceptual image hash is within a few bits of the new one is used instead; that
+    hash is coarse enough to miss an element moving on screen, so it is off by default.
+    """
+
+    def __init__(
+        self, path: str, ttl: float = 3600, max_distance: int = 0
+    ) -> None:
+        """
+        Initialize the cache and create its table if needed.
+
+        Args:
+            path (str): Path to the SQLite database file.
+            ttl (float, optional): Seconds an entry stays valid. Defaults to 3600.
+            max_distance (int, optional): Max number of differing image hash bits for
+                a near match, 0 to only use exact matches. Defaults to 0.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_distance = max_distance
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, prompt_hash TEXT NOT NULL, image_hash TEXT NOT NULL, "
+                "response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_prompt ON responses (prompt_hash, created)"
+            )
+
+    @classmethod
+    def from_env(cls, path: str) -> Optional["ResponseCache"]:
+        """Create a cache configured from the environment
+
+        Args:
+            path (str): Path to the SQLite database file.
+
+        Returns:
+            Optional[ResponseCache]: The cache, or None if NO_CACHE is set
+        """
+        if os.getenv("NO_CACHE"):
+            return None
+        return cls(
+            path,
+            ttl=float(os.getenv("CACHE_TTL", 3600)),
+            max_distance=int(os.getenv("CACHE_MAX_DISTANCE", 0)),
+        )
+
+    def fingerprint(self, prompt: str, img: Image.Image) -> CacheKey:
+        """Hash a prompt and image once, for both the lookup and the store
+
+        Args:
+            prompt (str): The prompt text
+            img (Image.Image): The image sent with the prompt, or anything that determines
+                it together with the prompt
+
+        Returns:
+            CacheKey: The key
+        """
+        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+        image_digest = hashlib.blake2b(
+            f"{img.mode}:{img.width}x{img.height}:".encode(), digest_size=16
+        )
+        image_digest.update(img.tobytes())
+        key = hashlib.sha256(f"{prompt_hash}:{image_digest.hexdigest()}".encode()).hexdigest()
+        return CacheKey(key, prompt_hash, dhash(img))
+
+    def get(self, key: CacheKey, expect: Type[T]) -> Optional[T]:
+        """Look up a cached response
+
+        Args:
+            key (CacheKey): Fingerprint of the prompt and image
+            expect (Type[T]): Model to parse the cached response into
+
+        Returns:
+            Optional[T]: The cached response, if any
+        """
+        oldest = time.time() - self.ttl
+
+        try:
+            with closing(sqlite3.connect(self.path)) as conn:
+                row = conn.execute(
+                    "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                    (key.key, oldest),
+                ).fetchone()
+                if not row and self.max_distance > 0:
+                    rows = conn.execute(
+                        "SELECT image_hash, response FROM responses "
+                        "WHERE prompt_hash = ? AND created >= ? ORDER BY created DESC LIMIT 256",
+                        (key.prompt_hash, oldest),
+                    ).fetchall()
+                    row = next(
+                        (
+                            (response,)
+                            for cached_hash, response in rows
+                            if bin(int(cached_hash, 16) ^ key.image_hash).count("1")
+                            <= self.max_distance
+                        ),
+                        None,
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"response cache lookup failed: {e}")
+            return None
+
+        if not row:
+            return None
+        try:
+            return expect.model_validate_json(row[0])
+        except Exception as e:
+            logger.debug(f"ignoring unparseable cached response: {e}")
+            return None
+
+    def put(self, key: CacheKey, response: BaseModel) -> None:
+        """Store a response
+
+        Args:
+            key (CacheKey): Fingerprint of the prompt and image
+            response (BaseModel): The parsed response
+        """
+        now = time.time()
+        try:
+            with closing(sqlite3.connect(self.path)) as conn, conn:
+                # expired entries are never read again, drop them so the file doesn't grow forever
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (
+                        key.key,
+                        key.prompt_hash,
+                        f"{key.image_hash:016x}",
+                        response.model_dump_json(),
+                        now,
+                    ),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"response cache store failed: {e}")
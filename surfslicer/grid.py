@@ -1,10 +1,54 @@
+import functools
+
 from PIL import Image, ImageDraw, ImageFont
 
+# Parsed fonts by size, so the TTF is only read from disk once per size
+_FONT_CACHE: dict[int, ImageFont.FreeTypeFont] = {}
+
+
+def _get_font(font_size):
+    font = _FONT_CACHE.get(font_size)
+    if font is None:
+        font = ImageFont.truetype("font/arialbd.ttf", font_size)
+        _FONT_CACHE[font_size] = font
+    return font
+
+# The bare circle every stamp starts from; shared, so copy it before drawing on it.
+@functools.lru_cache(maxsize=16)
+def _get_disc(font_size, color_circle):
+    circle_radius = font_size * 7 // 10
+    size = 2 * circle_radius + 1
+    disc = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(disc).ellipse([0, 0, 2 * circle_radius, 2 * circle_radius], fill=color_circle)
+    return disc
+
+# A single numbered dot, drawn on a tile just big enough for the circle so it
+# can be pasted onto the grid. The tiles repeat across grid sizes with the same
+# font size, so they are rendered once; they are shared and must not be modified.
+@functools.lru_cache(maxsize=256)
+def _get_stamp(number, font_size, color_circle, color_number):
+    circle_radius = font_size * 7 // 10
+    stamp = _get_disc(font_size, color_circle).copy()
+    draw = ImageDraw.Draw(stamp)
+    offset_x = font_size / 4 if number < 10 else font_size / 2
+    draw.text((circle_radius - offset_x, circle_radius - font_size / 2), str(number),
+              font=_get_font(font_size), fill=color_number)
+    return stamp
+
 # We need a simple grid: numbers from 1 to 9 in points on an intersection of nxn grid.
 # The font size may be 1/5 of the size of the height of the cell.
 # Therefore, we need the size of the image and colors, and the file_name. 
 
 def create_grid_image(image_width, image_height, color_circle, color_number, n, file_name):
+    img = get_grid_overlay(image_width, image_height, n, color_circle, color_number)
+    img.save(file_name)
+
+# The overlay only depends on the screen size, n and the colors, and the zoom loop
+# hits the same few sizes over and over, so we render each one once.
+# The returned image is shared between callers and must not be modified.
+# Each entry is a full-frame RGBA image (about 20 MB at 2880x1712), so keep the bound small.
+@functools.lru_cache(maxsize=16)
+def get_grid_overlay(image_width, image_height, n, color_circle, color_number):
     cell_width = image_width // n
     cell_height = image_height // n
     font_size = max(cell_height // 5, 20)
@@ -12,10 +56,6 @@ def create_grid_image(image_width, image_height, color_circle, color_number, n,
 
     # Create a blank image with transparent background
     img = Image.new('RGBA', (image_width, image_height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-
-    # Load a font
-    font = ImageFont.truetype("font/arialbd.ttf", font_size)
 
     # Set the number of cells in each dimension
     num_cells_x = n - 1 
@@ -25,35 +65,40 @@ def create_grid_image(image_width, image_height, color_circle, color_number, n,
     for i in range(num_cells_x):
         for j in range(num_cells_y):
             number = i * num_cells_y + j + 1
-            text = str(number)
             x = (i + 1) * cell_width
             y = (j + 1) * cell_height
-            draw.ellipse([x - circle_radius, y - circle_radius, 
-                          x + circle_radius, y + circle_radius], 
-                          fill=color_circle)
-            offset_x = font_size / 4 if number < 10 else font_size / 2
-            draw.text((x - offset_x, y - font_size / 2), text, font=font, fill=color_number)
+            stamp = _get_stamp(number, font_size, color_circle, color_number)
+            img.paste(stamp, (x - circle_radius, y - circle_radius), stamp)
 
-    # Save the image
-    img.save(file_name)
+    return img
+
+def _cell_origin(index, n, cell_width, cell_height):
+    # dots are numbered column by column, so the column is the quotient and the row the remainder
+    col, row = divmod(index - 1, n - 1)
+    return col * cell_width, row * cell_height
 
-def zoom_in(image_path, n, index, upscale):
-    img = Image.open(image_path)
-    width, height = img.size
+def zoom_box(width, height, n, index):
     # we need to calculate the cell size
     cell_width = width // n
     cell_height = height // n
     # we need to calculate the x and y coordinates of the cell
-    x = ((index - 1) // (n - 1)) * cell_width
-    y = ((index - 1) % (n - 1)) * cell_height
+    x, y = _cell_origin(index, n, cell_width, cell_height)
     # we need to calculate the x and y coordinates of the top left corner of the cell
     top_left = (x, y)
     # we need to calculate the x and y coordinates of the bottom right corner of the cell
     bottom_right = (x + 2 * cell_width, y + 2 * cell_height)
-    # we need to crop the image
-    
-    cropped_img = img.crop(top_left + bottom_right)
-    cropped_img = cropped_img.resize((cropped_img.width * upscale, cropped_img.height * upscale), resample=0)
+    return top_left, bottom_right
+
+def zoom_in(img, n, index, upscale):
+    top_left, bottom_right = zoom_box(img.width, img.height, n, index)
+    cell_width = img.width // n
+    cell_height = img.height // n
+    # we need to crop and upscale the image; resizing with a source box does both in one pass
+    cropped_img = img.resize(
+        (2 * cell_width * upscale, 2 * cell_height * upscale),
+        resample=Image.NEAREST,
+        box=top_left + bottom_right,
+    )
     return cropped_img, top_left, bottom_right
 #    cropped_img.save(new_image_path)
 #    return 2 * cell_width, 2 * cell_height
@@ -5,6 +5,10 @@ from io import BytesIO
 
 
 class Box:
+    # a click builds a handful of these per zoom depth; slots keep them small and
+    # make the attribute access a fixed offset instead of a dict lookup
+    __slots__ = ("left", "top", "right", "bottom")
+
     def __init__(self, left: int, top: int, right: int, bottom: int):
         self.left = left
         self.top = top
@@ -251,18 +255,23 @@ def superimpose_images(
     return merged_image
 
 
-def image_to_b64(img: Image.Image, image_format="PNG") -> str:
+def image_to_b64(img: Image.Image, image_format="PNG", compress_level: int = 6) -> str:
     """Converts a PIL Image to a base64-encoded string with MIME type included.
 
     Args:
         img (Image.Image): The PIL Image object to convert.
         image_format (str): The format to use when saving the image (e.g., 'PNG', 'JPEG').
+        compress_level (int): PNG zlib level from 0 to 9, lower is faster but larger.
+            Ignored for other formats. Defaults to 6.
 
     Returns:
         str: A base64-encoded string of the image with MIME type.
     """
     buffer = BytesIO()
-    img.save(buffer, format=image_format)
+    if image_format.upper() == "PNG":
+        img.save(buffer, format=image_format, compress_level=compress_level)
+    else:
+        img.save(buffer, format=image_format)
     image_data = buffer.getvalue()
     buffer.close()
 
@@ -289,6 +298,29 @@ def b64_to_image(base64_str: str) -> Image.Image:
     return image
 
 
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """Computes a difference hash of an image.
+
+    Similar looking images get hashes that differ in only a few bits.
+
+    Args:
+        img (Image.Image): The image to hash.
+        hash_size (int): Number of rows and bits per row. Defaults to 8.
+
+    Returns:
+        int: A hash of hash_size * hash_size bits.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
 def load_image_base64(filepath: str) -> str:
     # Load the image from the file path
     image = Image.open(filepath)
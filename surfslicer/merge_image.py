@@ -1,30 +1,26 @@
 import argparse
 from PIL import Image
 
-def superimpose_images(image1_path, image2_path, opacity):
-    # Open the images
-    image1 = Image.open(image1_path)
-    image2 = Image.open(image2_path)
-
+def superimpose_images(image1, image2, opacity):
     # Ensure both images have the same size
     if image1.size != image2.size:
         raise ValueError("Images must have the same dimensions.")
 
-    # Convert the images to RGBA mode if they are not already
-    image1 = image1.convert("RGBA")
-    image2 = image2.convert("RGBA")
-
-    # Create a new image with the same size as the input images
-    merged_image = Image.new("RGBA", image1.size)
-
-    # Convert image1 to grayscale
-    image1 = image1.convert("L")
+    # Convert image1 straight to grayscale and back to an opaque RGBA base, instead of
+    # going through RGBA, a blank canvas and a paste; each of those is a full pass
+    if image1.mode != "L":
+        image1 = image1.convert("L")
+    merged_image = image1.convert("RGBA")
 
-    # Paste image1 onto the merged image
-    merged_image.paste(image1, (0, 0))
+    # Convert image2 to RGBA mode if it is not already; convert() always copies
+    if image2.mode != "RGBA":
+        image2 = image2.convert("RGBA")
 
-    # Create a new image for image2 with adjusted opacity
-    image2_with_opacity = Image.blend(Image.new("RGBA", image2.size, (0, 0, 0, 0)), image2, opacity)
+    # Create a new image for image2 with adjusted opacity; blending at full opacity is a no-op
+    if opacity < 1:
+        image2_with_opacity = Image.blend(Image.new("RGBA", image2.size, (0, 0, 0, 0)), image2, opacity)
+    else:
+        image2_with_opacity = image2
 
     # Paste image2 with opacity onto the merged image
     merged_image = Image.alpha_composite(merged_image, image2_with_opacity)
@@ -38,6 +34,6 @@ if __name__ == "__main__":
     parser.add_argument("--opacity", type=float, default=0.5, help="Opacity value for image2 (default: 0.5)")
     args = parser.parse_args()
 
-    merged_image = superimpose_images(args.image1, args.image2, args.opacity)
+    merged_image = superimpose_images(Image.open(args.image1), Image.open(args.image2), args.opacity)
     merged_image_path = "merged_image.png"
     merged_image.save(merged_image_path)
\ No newline at end of file
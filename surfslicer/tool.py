@@ -1,21 +1,29 @@
-import hashlib
+import base64
+import functools
+import json
 import logging
 import os
 import time
-from typing import List, Optional, Tuple
+import weakref
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Set, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from agentdesk.device import Desktop
 from mllm import RoleMessage, RoleThread, Router
 from PIL import Image, ImageDraw
 from pydantic import BaseModel, Field
 from rich.console import Console
-from rich.json import JSON
 from taskara import Task
 from toolfuse import Tool, action
 
-from .grid import create_grid_image, zoom_in
-from .img import Box
+from .cache import ResponseCache
+from .grid import get_grid_overlay, zoom_box, zoom_in
+from .img import Box, image_to_b64
 from .merge_image import superimpose_images
 
 router = Router.from_env()
@@ -24,6 +32,110 @@ console = Console()
 logger = logging.getLogger(__name__)
 logger.setLevel(int(os.getenv("LOG_LEVEL", logging.DEBUG)))
 
+# Seconds to wait on agentd before giving up on a request
+_HTTP_TIMEOUT = 5
+
+
+@functools.cache
+def _config() -> SimpleNamespace:
+    """Zoom and click settings from the environment, read once per process"""
+    return SimpleNamespace(
+        max_depth=int(os.getenv("MAX_DEPTH", 3)),
+        color_number=os.getenv("COLOR_NUMBER", "yellow"),
+        color_circle=os.getenv("COLOR_CIRCLE", "red"),
+        # stop zooming once the selected box is at most this many screen pixels wide and high
+        early_exit_px=int(os.getenv("SURFSLICER_EARLY_EXIT_PX", 48)),
+        # "iterative" asks the model once per zoom depth, "path" asks for all depths at once
+        zoom_mode=os.getenv("ZOOM_MODE", "iterative"),
+        # agentd's endpoints return once the input has been sent, but give the desktop a
+        # moment to react; SURFSLICER_PACE_MS raises the pause for desktops that need more
+        settle=max(
+            int(os.getenv("MIN_SETTLE_MS", 50)), int(os.getenv("SURFSLICER_PACE_MS", 0))
+        )
+        / 1000,
+    )
+
+
+class ZoomSelection(BaseModel):
+    """Zoom selection model"""
+
+    number: int = Field(
+        ...,
+        description="Number of the dot closest to the place we want to click.",
+    )
+    confidence: float = Field(
+        0.0,
+        description="How sure we are that the dot is on the place we want to click, from 0 to 1.",
+    )
+
+
+_ZOOM_SCHEMA_JSON = json.dumps(ZoomSelection.model_json_schema())
+
+# The text that changes between clicks goes last, so every zoom request starts with the
+# same prefix and providers that cache prompt prefixes can reuse it
+_ZOOM_PROMPT_TEMPLATE = """
+You are an experienced AI trained to find the elements on the screen.
+You see a screenshot of the web application. 
+I have drawn some big {color_number} numbers on {color_circle} circles on this image 
+to help you to find required elements.
+Please tell me the closest big {color_number} number on a {color_circle} circle to the center of the element described below.
+Please note that some circles may lay on the element. If that's the case, return the number in any of these circles.
+Please also tell me how confident you are that this circle is on the element, from 0 to 1.
+Please return you response as raw JSON following the schema {schema}
+Be concise and only return the raw json, for example if the circle you wanted to select had a number 3 in it
+and you were fairly sure about it you would return {{"number": 3, "confidence": 0.8}}
+The element: {description}
+"""
+
+
+class ZoomPath(BaseModel):
+    """Zoom path model"""
+
+    numbers: List[int] = Field(
+        ...,
+        description="Number of the dot to zoom into at each depth, starting from the full screenshot.",
+    )
+
+
+_ZOOM_PATH_SCHEMA_JSON = json.dumps(ZoomPath.model_json_schema())
+
+_ZOOM_PATH_PROMPT_TEMPLATE = """
+You are an experienced AI trained to find the elements on the screen.
+You see a screenshot of the web application. 
+I have drawn some big {color_number} numbers on {color_circle} circles on this image 
+to help you to find required elements.
+The circles sit on the inner corners of a {n}x{n} grid and are numbered column by column,
+top to bottom, starting with 1 in the top-left.
+Picking a number zooms into the 2x2 cells around that circle, and the zoomed image gets
+the same numbered circles on it again.
+Please tell me the {max_depth} numbers you would pick, one per zoom, to end up on the center of the element described below.
+Please return you response as raw JSON following the schema {schema}
+Be concise and only return the raw json, for example {{"numbers": [3, 25, 25]}}
+The element: {description}
+"""
+
+
+def _encode_debug(img: Image.Image) -> str:
+    """Encode an image posted to the debug thread as a JPEG data URI.
+
+    Debug images are only looked at by humans, so JPEG is much cheaper to
+    encode and upload than the PNG the task would otherwise produce.
+
+    Args:
+        img (Image.Image): The image to encode.
+
+    Returns:
+        str: A base64-encoded JPEG data URI.
+    """
+    buffer = BytesIO()
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.save(buffer, format="JPEG", quality=85, optimize=False)
+    image_data = buffer.getvalue()
+    buffer.close()
+
+    return f"data:image/jpeg;base64,{base64.b64encode(image_data).decode('utf-8')}"
+
 
 class SemanticDesktop(Tool):
     """A semantic desktop replaces click actions with semantic description rather than coordinates"""
@@ -48,6 +160,80 @@ class SemanticDesktop(Tool):
 
         self.task = task
 
+        # Zoom selections for prompts and screens we have already seen
+        self._cache = ResponseCache.from_env(os.path.join(self.data_path, "cache.db"))
+        # cache keys already looked up during this task
+        self._asked: Set[str] = set()
+
+        # Keep connections to agentd alive between calls instead of a new one per request
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # CPU-bound image prep that can overlap with the network-bound model calls
+        self._prep_pool = ThreadPoolExecutor(max_workers=2)
+
+        # Debug messages are encoded and uploaded off the critical path; a single worker
+        # keeps them in the order they were posted
+        self._post_pool = ThreadPoolExecutor(max_workers=1)
+        # The same screenshot can be posted more than once (e.g. the first screenshot
+        # and zoom depth 0), so remember its encoding for as long as the image lives
+        self._debug_b64: Dict[int, str] = {}
+
+    def close(self, wait: bool = True) -> None:
+        """Flush pending debug messages and release the worker threads and connections
+
+        Args:
+            wait (bool, optional): Wait for pending messages to be posted. Defaults to True.
+        """
+        self._post_pool.shutdown(wait=wait)
+        self._prep_pool.shutdown(wait=wait)
+        self._session.close()
+
+    def __del__(self) -> None:
+        # the last reference may be dropped by a pool worker, which can't join itself
+        if hasattr(self, "_post_pool"):
+            self.close(wait=False)
+
+    def _post_async(self, **kwargs) -> Future:
+        """Post a message to the task in the background
+
+        Takes the same arguments as Task.post_message; images are encoded by the worker.
+
+        Returns:
+            Future: Done once this message, and every one posted before it, has been sent
+        """
+        # PIL decodes lazily and isn't thread-safe about it, so make sure the worker and
+        # the caller never both trigger the decode of the same image
+        for img in kwargs.get("images", []):
+            if isinstance(img, Image.Image):
+                img.load()
+        return self._post_pool.submit(self._safe_post, kwargs)
+
+    def _safe_post(self, kwargs: dict) -> None:
+        try:
+            images = kwargs.pop("images", [])
+            self.task.post_message(
+                images=[
+                    self._encode_once(img) if isinstance(img, Image.Image) else img
+                    for img in images
+                ],
+                **kwargs,
+            )
+        except Exception as e:
+            logger.warning(f"failed to post message: {e}")
+
+    def _encode_once(self, img: Image.Image) -> str:
+        key = id(img)
+        b64 = self._debug_b64.get(key)
+        if b64 is None:
+            b64 = _encode_debug(img)
+            self._debug_b64[key] = b64
+            # ids are reused once an image is freed, so drop the entry with it
+            weakref.finalize(img, self._debug_b64.pop, key, None)
+        return b64
+
     @action
     def click_object(self, description: str, type: str, button: str = "left") -> None:
         """Click on an object on the screen
@@ -64,22 +250,19 @@ class SemanticDesktop(Tool):
 
         logging.debug("clicking icon with description ", description)
 
-        max_depth = int(os.getenv("MAX_DEPTH", 3))
-        color_number = os.getenv("COLOR_NUMBER", "yellow")
-        color_circle = os.getenv("COLOR_CIRCLE", "red")
+        config = _config()
+        max_depth = config.max_depth
+        color_number = config.color_number
+        color_circle = config.color_circle
+        early_exit_px = config.early_exit_px
+        zoom_mode = config.zoom_mode
 
-        click_hash = hashlib.md5(description.encode()).hexdigest()[:5]
+        click_hash = f"{zlib.crc32(description.encode()):08x}"[:5]
 
-        class ZoomSelection(BaseModel):
-            """Zoom selection model"""
-
-            number: int = Field(
-                ...,
-                description="Number of the dot closest to the place we want to click.",
-            )
-
-        current_img = self.desktop.take_screenshots()[0]
-        original_img = current_img.copy()
+        current_img = self._take_screenshot()
+        # nothing below draws on the screenshot in place, so holding a reference is enough;
+        # the debug image takes its own copy before drawing the boxes
+        original_img = current_img
         img_width, img_height = current_img.size
 
         initial_box = Box(0, 0, img_width, img_height)
@@ -93,131 +276,330 @@ class SemanticDesktop(Tool):
         # we upscale the pieces that we cut out by this factor; otherwise it's hard to see the numbers
         upscale = 3
 
-        thread = RoleThread()
+        prompt = _ZOOM_PROMPT_TEMPLATE.format(
+            description=description,
+            color_number=color_number,
+            color_circle=color_circle,
+            schema=_ZOOM_SCHEMA_JSON,
+        )
 
-        prompt = f"""
-        You are an experienced AI trained to find the elements on the screen.
-        You see a screenshot of the web application. 
-        I have drawn some big {color_number} numbers on {color_circle} circles on this image 
-        to help you to find required elements.
-        Please tell me the closest big {color_number} number on a {color_circle} circle to the center of the {description}.
-        Please note that some circles may lay on the {description}. If that's the case, return the number in any of these circles.
-        Please return you response as raw JSON following the schema {ZoomSelection.model_json_schema()}
-        Be concise and only return the raw json, for example if the circle you wanted to select had a number 3 in it
-        you would return {{"number": 3}}
-        """
+        debug = logger.isEnabledFor(logging.DEBUG)
 
-        self.task.post_message(
+        self._post_async(
             role="assistant",
             msg=f"Clicking '{type}' on object '{description}'",
             thread="debug",
-            images=[current_img],
+            images=[current_img] if debug else [],
         )
 
-        for i in range(max_depth):
-            logger.info(f"zoom depth {i}")
-            image_path = os.path.join(self.img_path, f"{click_hash}_current_{i}.png")
-            current_img.save(image_path)
-            img_width, img_height = current_img.size
-
-            self.task.post_message(
-                role="assistant",
-                msg=f"Zooming into image with depth {i}",
-                thread="debug",
-                images=[current_img],
-            )
-
-            grid_path = os.path.join(self.img_path, f"{click_hash}_grid_{i}.png")
-            create_grid_image(
-                img_width, img_height, color_circle, color_number, n, grid_path
-            )
-
-            merged_image_path = os.path.join(
-                self.img_path, f"{click_hash}_merge_{i}.png"
+        path_boxes = None
+        if zoom_mode == "path":
+            path_boxes = self._zoom_path(
+                current_img,
+                description,
+                max_depth,
+                n,
+                upscale,
+                color_circle,
+                color_number,
             )
-            merged_image = superimpose_images(image_path, grid_path, 1)
-            merged_image.save(merged_image_path)
 
-            self.task.post_message(
-                role="assistant",
-                msg=f"Merge image for depth {i}",
-                thread="debug",
-                images=[merged_image],
-            )
-
-            msg = RoleMessage(
-                role="user",
-                text=prompt,
-                images=[merged_image],
-            )
-            thread.add_msg(msg)
-
-            try:
-                response = router.chat(
-                    thread, namespace="zoom", expect=ZoomSelection, agent_id="SurfSlicer", retries=1
+        if path_boxes:
+            bounding_boxes = path_boxes
+        else:
+            next_grid: Optional[Future] = None
+
+            for i in range(max_depth):
+                logger.info(f"zoom depth {i}")
+                if debug:
+                    image_path = os.path.join(self.img_path, f"{click_hash}_current_{i}.png")
+                    current_img.save(image_path)
+
+                    self._post_async(
+                        role="assistant",
+                        msg=f"Zooming into image with depth {i}",
+                        thread="debug",
+                        images=[current_img],
+                    )
+                img_width, img_height = current_img.size
+
+                if next_grid is not None:
+                    grid_img = next_grid.result()
+                else:
+                    grid_img = get_grid_overlay(
+                        img_width, img_height, n, color_circle, color_number
+                    )
+
+                # The model only ever sees the grayscale image, so zoom into that: the crop
+                # and upscale then move a single channel instead of three or four
+                if current_img.mode != "L":
+                    current_img = current_img.convert("L")
+                merged_image = superimpose_images(current_img, grid_img, 1)
+
+                if debug:
+                    merged_image_path = os.path.join(
+                        self.img_path, f"{click_hash}_merge_{i}.png"
+                    )
+                    merged_image.save(merged_image_path)
+
+                    self._post_async(
+                        role="assistant",
+                        msg=f"Merge image for depth {i}",
+                        thread="debug",
+                        images=[merged_image],
+                    )
+
+                # Each depth is a fresh question about the latest image only; carrying the
+                # earlier turns along would re-send every previous screenshot to the model
+                thread = RoleThread()
+                msg = RoleMessage(
+                    role="user",
+                    text=prompt,
+                    # the image is only sent once, so the fastest PNG level beats a smaller upload
+                    images=[image_to_b64(merged_image, compress_level=1)],
                 )
-                if not response.parsed:
-                    raise SystemError("No response parsed from zoom")
-                
-                logger.info(f"zoom response {response}")
-
-                self.task.add_prompt(response.prompt)
-
-                zoom_resp = response.parsed
-                self.task.post_message(
-                    role="assistant",
-                    msg=f"Selection {zoom_resp.model_dump_json()}",
-                    thread="debug",
+                thread.add_msg(msg)
+
+                # The size of the next zoomed image doesn't depend on the chosen number,
+                # so render its grid while we wait on the model
+                next_grid = None
+                if i < max_depth - 1:
+                    next_grid = self._prep_pool.submit(
+                        get_grid_overlay,
+                        2 * (img_width // n) * upscale,
+                        2 * (img_height // n) * upscale,
+                        n,
+                        color_circle,
+                        color_number,
+                    )
+
+                try:
+                    zoom_resp = None
+                    if self._cache:
+                        # the grid is fixed by the image size and the prompt's colours, so the
+                        # grayscale image pins down the merged one at a quarter of the bytes
+                        cache_key = self._cache.fingerprint(prompt, current_img)
+                        # the same question about an unchanged screen within a task means the
+                        # earlier click didn't work, so ask the model again instead of replaying it
+                        if cache_key.key not in self._asked:
+                            zoom_resp = self._cache.get(cache_key, ZoomSelection)
+                        self._asked.add(cache_key.key)
+
+                    if zoom_resp:
+                        logger.info(f"zoom response from cache {zoom_resp}")
+                    else:
+                        response = router.chat(
+                            thread, namespace="zoom", expect=ZoomSelection, agent_id="SurfSlicer", retries=1
+                        )
+                        if not response.parsed:
+                            raise SystemError("No response parsed from zoom")
+
+                        logger.info(f"zoom response {response}")
+
+                        self.task.add_prompt(response.prompt)
+
+                        zoom_resp = response.parsed
+                        # zoom_in can't box a dot that isn't on the grid
+                        if not 1 <= zoom_resp.number <= (n - 1) ** 2:
+                            raise ValueError(f"No dot numbered {zoom_resp.number}")
+                        if self._cache:
+                            self._cache.put(cache_key, zoom_resp)
+
+                    self._post_async(
+                        role="assistant",
+                        msg=f"Selection {zoom_resp.model_dump_json()}",
+                        thread="debug",
+                    )
+                    if debug:
+                        console.print_json(zoom_resp.model_dump_json())
+                    chosen_number = zoom_resp.number
+                    confidence = zoom_resp.confidence
+                except Exception as e:
+                    logger.info(f"Error in analyzing zoom: {e}.")
+
+                    # MOST of the times when it fails, it's on the last level of Zoom. 
+                    # The workaround is to pick the number in the middle of the image.
+                    if n % 2 == 0:
+                        chosen_number = ((n - 1) ** 2 + 1) // 2
+                    else:
+                        chosen_number = (n - 1) ** 2 // 2 - (n - 1) // 2
+                    confidence = 0.0
+                    self._post_async(
+                        role="assistant",
+                        msg=f"Failed to analyze. Fall back to #{chosen_number}",
+                        thread="debug",
+                    )
+
+                top_left, bottom_right = zoom_box(
+                    img_width, img_height, n, chosen_number
                 )
-                console.print(JSON(zoom_resp.model_dump_json()))
-                chosen_number = zoom_resp.number
-            except Exception as e:
-                logger.info(f"Error in analyzing zoom: {e}.")
-
-                # MOST of the times when it fails, it's on the last level of Zoom. 
-                # The workaround is to pick the number in the middle of the image.
-                if n % 2 == 0:
-                    chosen_number = ((n - 1) ** 2 + 1) // 2
-                else:
-                    chosen_number = (n - 1) ** 2 // 2 - (n - 1) // 2
-                self.task.post_message(
-                    role="assistant",
-                    msg=f"Failed to analyze. Fall back to #{chosen_number}",
-                    thread="debug",
+                bounding_box = Box(
+                    top_left[0], top_left[1], bottom_right[0], bottom_right[1]
                 )
-
-            zoomed_img, top_left, bottom_right = zoom_in(
-                image_path, n, chosen_number, upscale
-            )
-            current_img = zoomed_img.copy()
-            bounding_box = Box(
-                top_left[0], top_left[1], bottom_right[0], bottom_right[1]
-            )
-            absolute_box = bounding_box.to_absolute_with_upscale(
-                bounding_boxes[-1], total_upscale
-            )
-            total_upscale *= upscale
-            bounding_boxes.append(absolute_box)
+                absolute_box = bounding_box.to_absolute_with_upscale(
+                    bounding_boxes[-1], total_upscale
+                )
+                total_upscale *= upscale
+                bounding_boxes.append(absolute_box)
+
+                # Stop once the box is small enough to click accurately, or the model is
+                # sure about an already zoomed-in image; the last depth ends the zoom anyway
+                if i < max_depth - 1 and (
+                    (
+                        absolute_box.width() <= early_exit_px
+                        and absolute_box.height() <= early_exit_px
+                    )
+                    or (confidence > 0.9 and i >= 1)
+                ):
+                    logger.info(f"stopping zoom early at depth {i}")
+                    break
+
+                # nobody looks at the last zoomed image, we only need its box
+                if i < max_depth - 1:
+                    current_img, _, _ = zoom_in(current_img, n, chosen_number, upscale)
 
         click_x, click_y = bounding_boxes[-1].center()
         logger.info(f"clicking exact coords {click_x}, {click_y}")
-        self.task.post_message(
+        pending = self._post_async(
             role="assistant",
             msg=f"Clicking coordinates {click_x}, {click_y}",
             thread="debug",
         )
 
-        debug_img = self._debug_image(
-            original_img.copy(), bounding_boxes, (click_x, click_y)
+        if debug:
+            debug_img = self._debug_image(original_img, bounding_boxes, (click_x, click_y))
+            pending = self._post_async(
+                role="assistant",
+                msg="Final debug img",
+                thread="debug",
+                images=[debug_img],
+            )
+        try:
+            self._click_coords(x=click_x, y=click_y, type=type, button=button)
+        finally:
+            # the agent posts to the debug thread itself once we return, so our messages
+            # have to be out first; the upload still overlaps the click
+            pending.result()
+        return
+
+    def _zoom_path(
+        self,
+        img: Image.Image,
+        description: str,
+        max_depth: int,
+        n: int,
+        upscale: int,
+        color_circle: str,
+        color_number: str,
+    ) -> Optional[List[Box]]:
+        """Ask the model for the whole zoom path in a single call
+
+        Args:
+            img (Image.Image): Screenshot to zoom into
+            description (str): Description of the object to click
+            max_depth (int): Number of zoom depths
+            n (int): Number of cells along one side of the grid
+            upscale (int): Upscale factor applied to every zoomed image
+            color_circle (str): Color of the circles
+            color_number (str): Color of the numbers
+
+        Returns:
+            Optional[List[Box]]: Boxes for every depth, in screenshot coordinates, or None
+                if the model didn't return a usable path
+        """
+        img_width, img_height = img.size
+        grid_img = get_grid_overlay(img_width, img_height, n, color_circle, color_number)
+        merged_image = superimpose_images(img, grid_img, 1)
+
+        prompt = _ZOOM_PATH_PROMPT_TEMPLATE.format(
+            description=description,
+            color_number=color_number,
+            color_circle=color_circle,
+            n=n,
+            max_depth=max_depth,
+            schema=_ZOOM_PATH_SCHEMA_JSON,
         )
-        self.task.post_message(
+
+        thread = RoleThread()
+        thread.add_msg(
+            RoleMessage(
+                role="user",
+                text=prompt,
+                # sent once, like the iterative zoom images, so use the fastest PNG level
+                images=[image_to_b64(merged_image, compress_level=1)],
+            )
+        )
+
+        try:
+            response = router.chat(
+                thread, namespace="zoom", expect=ZoomPath, agent_id="SurfSlicer", retries=1
+            )
+            if not response.parsed:
+                raise SystemError("No response parsed from zoom path")
+            self.task.add_prompt(response.prompt)
+            numbers = response.parsed.numbers
+        except Exception as e:
+            logger.info(f"Error in analyzing zoom path: {e}. Falling back to iterative zoom.")
+            return None
+
+        # A path we can't replay means the model misread the instructions, and the
+        # iterative zoom is a safer bet than guessing what it meant
+        num_dots = (n - 1) ** 2
+        if len(numbers) != max_depth or not all(1 <= num <= num_dots for num in numbers):
+            logger.info(f"Inconsistent zoom path {numbers}. Falling back to iterative zoom.")
+            return None
+
+        self._post_async(
             role="assistant",
-            msg="Final debug img",
+            msg=f"Zoom path {numbers}",
             thread="debug",
-            images=[debug_img],
         )
-        self._click_coords(x=click_x, y=click_y, type=type, button=button)
-        return
+
+        # Replay the zoom geometrically: the boxes only depend on the image sizes
+        bounding_boxes = [Box(0, 0, img_width, img_height)]
+        total_upscale = 1
+        for number in numbers:
+            top_left, bottom_right = zoom_box(img_width, img_height, n, number)
+            bounding_box = Box(top_left[0], top_left[1], bottom_right[0], bottom_right[1])
+            bounding_boxes.append(
+                bounding_box.to_absolute_with_upscale(bounding_boxes[-1], total_upscale)
+            )
+            img_width = bounding_box.width() * upscale
+            img_height = bounding_box.height() * upscale
+            total_upscale *= upscale
+
+        return bounding_boxes
+
+    def _take_screenshot(self) -> Image.Image:
+        """Take a screenshot over the pooled session
+
+        agentd currently answers with base64 images in JSON. The request also offers to take
+        a raw WebP or PNG, which skips the base64 step on servers that can send one.
+
+        Returns:
+            Image.Image: The screenshot, already decoded
+        """
+        try:
+            resp = self._session.post(
+                f"{self.desktop.base_url}/v1/screenshot",
+                params={"count": 1, "delay": 0.0},
+                headers={"Accept": "image/webp, image/png;q=0.9, application/json;q=0.5"},
+                timeout=_HTTP_TIMEOUT,
+            )
+            resp.raise_for_status()
+            if resp.headers.get("Content-Type", "").startswith("image/"):
+                img = Image.open(BytesIO(resp.content))
+            else:
+                img = Image.open(BytesIO(base64.b64decode(resp.json()["images"][0])))
+        except requests.Timeout:
+            # the desktop client would hit the same unresponsive server, without a timeout
+            raise
+        except (requests.RequestException, KeyError) as e:
+            logger.info(f"Error taking screenshot: {e}. Falling back to the desktop client.")
+            img = self.desktop.take_screenshots()[0]
+        # decode now rather than on first use, which may be on the debug post worker
+        img.load()
+        return img
 
     def _click_coords(
         self, x: int, y: int, type: str = "single", button: str = "left"
@@ -232,37 +614,86 @@ class SemanticDesktop(Tool):
             type (str, optional): Type of click, can be single or double. Defaults to "single".
             button (str, optional): Button to click. Defaults to "left".
         """
+        settle = _config().settle
+
         # TODO: fix click cords in agentd
         logging.debug("moving mouse")
         body = {"x": int(x), "y": int(y)}
-        resp = requests.post(f"{self.desktop.base_url}/v1/move_mouse", json=body)
+        resp = self._session.post(
+            f"{self.desktop.base_url}/v1/move_mouse", json=body, timeout=_HTTP_TIMEOUT
+        )
         resp.raise_for_status()
-        time.sleep(2)
+        self._wait_for_mouse(int(x), int(y))
+        time.sleep(settle)
 
         if type == "single":
             logging.debug("clicking")
-            resp = requests.post(
-                f"{self.desktop.base_url}/v1/click", json={"button": button}
+            resp = self._session.post(
+                f"{self.desktop.base_url}/v1/click",
+                json={"button": button},
+                timeout=_HTTP_TIMEOUT,
             )
             resp.raise_for_status()
-            time.sleep(2)
+            time.sleep(settle)
         elif type == "double":
             logging.debug("double clicking")
-            resp = requests.post(
-                f"{self.desktop.base_url}/v1/double_click", json={"button": button}
+            resp = self._session.post(
+                f"{self.desktop.base_url}/v1/double_click",
+                json={"button": button},
+                timeout=_HTTP_TIMEOUT,
             )
             resp.raise_for_status()
-            time.sleep(2)
+            time.sleep(settle)
         else:
             raise ValueError(f"unkown click type {type}")
         return
 
+    def _wait_for_mouse(
+        self, x: int, y: int, timeout: float = 2.0, tolerance: int = 2
+    ) -> None:
+        """Wait until agentd reports the mouse at the given coordinates
+
+        Polls with exponential backoff capped at 200ms, and gives up quietly after the timeout
+        or if a poll fails; the mouse has already been moved, so the click goes ahead.
+
+        Args:
+            x (int): X coordinate the mouse was moved to
+            y (int): Y coordinate the mouse was moved to
+            timeout (float, optional): Seconds to wait at most. Defaults to 2.0.
+            tolerance (int, optional): Pixels the reported position may be off by,
+                e.g. from display scaling. Defaults to 2.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                resp = self._session.get(
+                    f"{self.desktop.base_url}/v1/mouse_coordinates",
+                    timeout=min(_HTTP_TIMEOUT, remaining),
+                )
+                resp.raise_for_status()
+                coords = resp.json()
+                if abs(coords["x"] - x) <= tolerance and abs(coords["y"] - y) <= tolerance:
+                    return
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.debug(f"failed to poll mouse coordinates: {e}")
+                return
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, 0.2)
+        logger.debug(f"mouse did not reach ({x}, {y}) within {timeout}s")
+
     def _debug_image(
         self,
         img: Image.Image,
         boxes: List[Box],
         final_click: Optional[Tuple[int, int]] = None,
     ) -> Image.Image:
+        # the conversion doubles as the copy we draw on, and leaves the image in the mode
+        # the JPEG encoder needs
+        img = img.convert("RGB")
         draw = ImageDraw.Draw(img)
         for box in boxes:
             box.draw(draw)
@@ -0,0 +1,75 @@
+import sqlite3
+from contextlib import closing
+
+from PIL import Image, ImageDraw
+from pydantic import BaseModel
+from surfslicer.cache import ResponseCache
+from surfslicer.img import dhash
+
+
+class Selection(BaseModel):
+    number: int
+
+
+def create_test_image(width=200, height=100, box=None):
+    """Helper function to create a gradient image, optionally with a black box on it."""
+    img = Image.linear_gradient("L").rotate(90).resize((width, height)).convert("RGB")
+    if box:
+        ImageDraw.Draw(img).rectangle(box, fill="black")
+    return img
+
+
+def test_exact_hit(tmp_path):
+    """A stored response comes back for the same prompt and image."""
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    img = create_test_image()
+    key = cache.fingerprint("find the button", img)
+    assert cache.get(key, Selection) is None
+    cache.put(key, Selection(number=3))
+    assert cache.get(key, Selection) == Selection(number=3)
+    assert cache.get(cache.fingerprint("find the link", img), Selection) is None
+
+
+def test_near_hit(tmp_path):
+    """With near matching on, images that differ by a few pixels still hit."""
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_distance=2)
+    cache.put(cache.fingerprint("find the button", create_test_image()), Selection(number=3))
+    nearly = create_test_image().copy()
+    nearly.putpixel((10, 10), (0, 0, 0))
+    assert cache.get(cache.fingerprint("find the button", nearly), Selection) == Selection(number=3)
+
+
+def test_different_image_misses(tmp_path):
+    """A visibly different screen is a miss."""
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_distance=0)
+    cache.put(cache.fingerprint("find the button", create_test_image()), Selection(number=3))
+    other = create_test_image(box=(80, 0, 120, 100))
+    assert cache.get(cache.fingerprint("find the button", other), Selection) is None
+
+
+def test_small_change_misses(tmp_path):
+    """Exact matches compare the pixels, not the perceptual hash."""
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    cache.put(cache.fingerprint("find the button", create_test_image()), Selection(number=3))
+    nearly = create_test_image().copy()
+    nearly.putpixel((10, 10), (0, 0, 0))
+    assert dhash(nearly) == dhash(create_test_image())
+    assert cache.get(cache.fingerprint("find the button", nearly), Selection) is None
+
+
+def test_put_prunes_expired(tmp_path):
+    """Storing a response drops the expired entries."""
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=-1)
+    cache.put(cache.fingerprint("find the button", create_test_image()), Selection(number=3))
+    cache.put(cache.fingerprint("find the link", create_test_image()), Selection(number=4))
+    with closing(sqlite3.connect(cache.path)) as conn:
+        rows = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert rows == 1
+
+
+def test_expired(tmp_path):
+    """Entries older than the TTL are ignored."""
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=-1)
+    img = create_test_image()
+    cache.put(cache.fingerprint("find the button", img), Selection(number=3))
+    assert cache.get(cache.fingerprint("find the button", img), Selection) is None
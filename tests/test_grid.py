@@ -0,0 +1,100 @@
+from PIL import Image, ImageFont
+from surfslicer.grid import (
+    _FONT_CACHE,
+    _get_disc,
+    _get_stamp,
+    create_grid_image,
+    get_grid_overlay,
+    zoom_box,
+    zoom_in,
+)
+from surfslicer.merge_image import superimpose_images
+
+
+def create_test_image(width, height, color=(255, 0, 0, 255)):
+    """Helper function to create a plain color image."""
+    img = Image.new("RGBA", (width, height), color)
+    return img
+
+
+def test_zoom_in():
+    """Test zooming into the cells around a dot of an 8x8 grid."""
+    base_img = create_test_image(800, 400)
+    zoomed_img, top_left, bottom_right = zoom_in(base_img, 8, 1, 3)
+    assert top_left == (0, 0)
+    assert bottom_right == (200, 100)
+    assert zoomed_img.size == (600, 300)
+
+
+def test_zoom_in_column_major():
+    """Numbers run down the columns first."""
+    base_img = create_test_image(800, 400)
+    _, top_left, bottom_right = zoom_in(base_img, 8, 9, 1)
+    assert top_left == (100, 50)
+    assert bottom_right == (300, 150)
+
+
+def test_superimpose_images():
+    """Test superimposing in-memory images."""
+    base_img = create_test_image(100, 100)
+    layer_img = create_test_image(100, 100, (0, 255, 0, 0))
+    merged = superimpose_images(base_img, layer_img, 1)
+    assert merged.size == base_img.size
+    # A fully transparent layer leaves the grayscale base untouched
+    gray = base_img.convert("L").getpixel((0, 0))
+    assert merged.getpixel((0, 0)) == (gray, gray, gray, 255)
+
+
+def _clear_rendered():
+    get_grid_overlay.cache_clear()
+    _get_stamp.cache_clear()
+    _get_disc.cache_clear()
+
+
+def test_create_grid_image_reuses_font(tmp_path, monkeypatch):
+    """The grid font is parsed once per size, even when the grid is drawn again."""
+    loads = []
+    truetype = ImageFont.truetype
+
+    def counting_truetype(*args, **kwargs):
+        loads.append(args)
+        return truetype(*args, **kwargs)
+
+    monkeypatch.setattr(ImageFont, "truetype", counting_truetype)
+    _FONT_CACHE.clear()
+    _clear_rendered()
+    create_grid_image(800, 400, "red", "yellow", 8, str(tmp_path / "grid.png"))
+    # drop the rendered images so the second grid is drawn from scratch
+    _clear_rendered()
+    create_grid_image(800, 400, "red", "yellow", 8, str(tmp_path / "grid.png"))
+    assert len(loads) == 1
+
+
+def test_get_grid_overlay_is_cached():
+    """The overlay is rendered once per size and colors."""
+    overlay = get_grid_overlay(800, 400, 8, "red", "yellow")
+    assert overlay.size == (800, 400)
+    assert overlay.mode == "RGBA"
+    assert get_grid_overlay(800, 400, 8, "red", "yellow") is overlay
+    assert get_grid_overlay(800, 400, 8, "blue", "yellow") is not overlay
+
+
+def test_zoom_box_matches_zoom_in():
+    """zoom_box gives the same corners as zoom_in without touching pixels."""
+    base_img = create_test_image(800, 400)
+    for index in (1, 9, 25, 49):
+        _, top_left, bottom_right = zoom_in(base_img, 8, index, 3)
+        assert zoom_box(800, 400, 8, index) == (top_left, bottom_right)
+
+
+def test_zoom_in_grayscale_matches_color():
+    """Zooming into the grayscale image gives the same merged image as zooming in color."""
+    base_img = Image.linear_gradient("L").resize((800, 400)).convert("RGB")
+    overlay = get_grid_overlay(200 * 3, 100 * 3, 8, "red", "yellow")
+    color_zoom, _, _ = zoom_in(base_img, 8, 9, 3)
+    gray_zoom, _, _ = zoom_in(base_img.convert("L"), 8, 9, 3)
+    assert gray_zoom.mode == "L"
+    assert (
+        superimpose_images(gray_zoom, overlay, 1).tobytes()
+        == superimpose_images(color_zoom, overlay, 1).tobytes()
+    )
@@ -4,6 +4,9 @@ from surfslicer.img import (
     zoom_in,
     superimpose_images,
     Box,
+    b64_to_image,
+    dhash,
+    image_to_b64,
 )  # Adjust the import according to your module structure
 
 
@@ -62,3 +65,20 @@ def test_superimpose_images():
     superimposed_img = superimpose_images(base_img, layer_img)
     assert superimposed_img.size == base_img.size
     # Further checks could verify pixel values to ensure correct superimposition.
+
+
+def test_dhash():
+    """Identical images hash the same, different ones don't."""
+    gradient = Image.linear_gradient("L").rotate(90).resize((90, 80))
+    assert dhash(gradient) == dhash(gradient.convert("RGB"))
+    assert dhash(gradient) != dhash(gradient.transpose(Image.FLIP_LEFT_RIGHT))
+    assert dhash(gradient) < 2**64
+
+
+def test_image_to_b64_compress_level():
+    """Any PNG compression level round-trips to the same pixels."""
+    img = create_test_image(64, 32, (10, 20, 30, 255))
+    fast = image_to_b64(img, compress_level=1)
+    small = image_to_b64(img, compress_level=9)
+    assert fast.startswith("data:image/png;base64,")
+    assert b64_to_image(fast).tobytes() == b64_to_image(small).tobytes() == img.tobytes()
@@ -0,0 +1,235 @@
+import base64
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+import requests
+from PIL import Image
+
+import surfslicer.tool as tool
+from surfslicer.cache import ResponseCache
+from surfslicer.tool import SemanticDesktop, ZoomPath, ZoomSelection
+
+
+class FakeResponse:
+    def __init__(self, json_data=None):
+        self._json = json_data
+        self.headers = {"Content-Type": "application/json"}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._json
+
+
+class FakeSession:
+    """Stands in for the requests session to agentd, tracking where the mouse is."""
+
+    def __init__(self, screenshot):
+        buffer = BytesIO()
+        screenshot.save(buffer, format="PNG")
+        self.screenshot_b64 = base64.b64encode(buffer.getvalue()).decode()
+        self.mouse = (0, 0)
+        self.posts = []
+
+    def post(self, url, json=None, **kwargs):
+        self.posts.append((url.rsplit("/", 1)[-1], json))
+        if url.endswith("/v1/screenshot"):
+            return FakeResponse({"images": [self.screenshot_b64]})
+        if url.endswith("/v1/move_mouse"):
+            self.mouse = (json["x"], json["y"])
+        return FakeResponse()
+
+    def get(self, url, **kwargs):
+        return FakeResponse({"x": self.mouse[0], "y": self.mouse[1]})
+
+    def close(self):
+        pass
+
+
+class FakeRouter:
+    """Answers each zoom request with the next of the given responses."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def chat(self, thread, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(parsed=self.responses.pop(0), prompt=None)
+
+
+class FakeTask:
+    id = "test"
+
+    def __init__(self):
+        self.messages = []
+
+    def post_message(self, **kwargs):
+        time.sleep(0.01)
+        self.messages.append(kwargs["msg"])
+
+    def add_prompt(self, prompt):
+        pass
+
+
+@pytest.fixture
+def semdesk(tmp_path, monkeypatch):
+    monkeypatch.setenv("NO_CACHE", "1")
+    monkeypatch.setenv("MIN_SETTLE_MS", "0")
+    tool._config.cache_clear()
+    desktop = SimpleNamespace(base_url="http://agentd")
+    semdesk = SemanticDesktop(FakeTask(), desktop, data_path=str(tmp_path))
+    semdesk._session = FakeSession(Image.new("RGB", (1920, 1080), "white"))
+    yield semdesk
+    semdesk.close()
+    tool._config.cache_clear()
+
+
+def test_screenshot_is_decoded_before_posting(semdesk, tmp_path):
+    """The debug worker and the zoom loop can use the screenshot at the same time."""
+    for _ in range(10):
+        img = semdesk._take_screenshot()
+        assert img.tile == []
+        semdesk._post_async(role="assistant", msg="screenshot", thread="debug", images=[img])
+        img.save(tmp_path / "current.png")
+
+
+def test_out_of_range_number_falls_back_to_center(semdesk, monkeypatch):
+    """A number that isn't on the grid picks the center dot instead of failing the click."""
+    monkeypatch.setenv("MAX_DEPTH", "2")
+    router = FakeRouter(ZoomSelection(number=64), ZoomSelection(number=25))
+    monkeypatch.setattr(tool, "router", router)
+    semdesk.click_object("the button", "single")
+    assert router.calls == 2
+    fallback_click = semdesk._session.mouse
+
+    # the center dot of an 8x8 grid is 25
+    monkeypatch.setattr(
+        tool, "router", FakeRouter(ZoomSelection(number=25), ZoomSelection(number=25))
+    )
+    semdesk.click_object("the button", "single")
+    assert semdesk._session.mouse == fallback_click
+
+
+def test_wait_for_mouse_gives_up_on_failed_poll(semdesk, monkeypatch):
+    """A failed poll doesn't abort the click after the mouse has moved."""
+
+    def broken_get(url, **kwargs):
+        raise requests.ConnectionError("agentd went away")
+
+    monkeypatch.setattr(semdesk._session, "get", broken_get)
+    semdesk._click_coords(100, 100)
+    assert [name for name, _ in semdesk._session.posts] == ["move_mouse", "click"]
+
+
+def test_take_screenshot_does_not_retry_after_timeout(semdesk, monkeypatch):
+    """A timed out screenshot isn't taken a second time through the desktop client."""
+
+    def slow_post(url, **kwargs):
+        raise requests.Timeout("agentd is busy")
+
+    def take_screenshots():
+        raise AssertionError("screenshot retried")
+
+    monkeypatch.setattr(semdesk._session, "post", slow_post)
+    monkeypatch.setattr(semdesk.desktop, "take_screenshots", take_screenshots, raising=False)
+    with pytest.raises(requests.Timeout):
+        semdesk._take_screenshot()
+
+
+def _box_corners(boxes):
+    return [(box.left, box.top, box.right, box.bottom) for box in boxes]
+
+
+def test_zoom_path_replays_iterative_zoom(semdesk, monkeypatch):
+    """A path gives the same boxes as zooming in one depth at a time."""
+    monkeypatch.setenv("SURFSLICER_EARLY_EXIT_PX", "0")
+    numbers = [9, 25, 40]
+
+    boxes = []
+    monkeypatch.setattr(
+        semdesk, "_debug_image", lambda img, bounding_boxes, click: boxes.extend(bounding_boxes)
+    )
+    monkeypatch.setattr(
+        tool, "router", FakeRouter(*(ZoomSelection(number=number) for number in numbers))
+    )
+    semdesk.click_object("the button", "single")
+
+    monkeypatch.setattr(tool, "router", FakeRouter(ZoomPath(numbers=numbers)))
+    img = Image.new("RGB", (1920, 1080), "white")
+    path_boxes = semdesk._zoom_path(img, "the button", 3, 8, 3, "red", "yellow")
+    assert len(boxes) == 4
+    assert _box_corners(path_boxes) == _box_corners(boxes)
+
+
+@pytest.mark.parametrize("numbers", [[], [9, 25], [9, 25, 40, 25], [0, 25, 25], [9, 50, 25]])
+def test_zoom_path_rejects_inconsistent_paths(semdesk, monkeypatch, numbers):
+    """Paths of the wrong length or with numbers off the grid aren't replayed."""
+    monkeypatch.setattr(tool, "router", FakeRouter(ZoomPath(numbers=numbers)))
+    img = Image.new("RGB", (1920, 1080), "white")
+    assert semdesk._zoom_path(img, "the button", 3, 8, 3, "red", "yellow") is None
+
+
+def test_zoom_stops_on_small_box(semdesk, monkeypatch):
+    """Zooming stops once the box is small enough to click."""
+    # on a 1920x1080 screen the boxes are 480x270, then 120x68, then 30x17
+    monkeypatch.setenv("SURFSLICER_EARLY_EXIT_PX", "150")
+    router = FakeRouter(*(ZoomSelection(number=25) for _ in range(3)))
+    monkeypatch.setattr(tool, "router", router)
+    semdesk.click_object("the button", "single")
+    assert router.calls == 2
+
+
+def test_zoom_stops_when_confident(semdesk, monkeypatch):
+    """A confident answer on a zoomed image ends the zoom, but not on the full screenshot."""
+    router = FakeRouter(*(ZoomSelection(number=25, confidence=0.95) for _ in range(3)))
+    monkeypatch.setattr(tool, "router", router)
+    semdesk.click_object("the button", "single")
+    assert router.calls == 2
+
+
+def test_wait_for_mouse_tolerates_small_offsets(semdesk, monkeypatch):
+    """A pointer a couple of pixels off the target counts as arrived."""
+    polls = []
+
+    def get(url, **kwargs):
+        polls.append(url)
+        return FakeResponse({"x": 102, "y": 98})
+
+    monkeypatch.setattr(semdesk._session, "get", get)
+    semdesk._wait_for_mouse(100, 100)
+    assert len(polls) == 1
+
+
+def test_click_object_posts_its_messages_before_returning(semdesk, monkeypatch):
+    """Debug messages queued by a click are sent before the agent posts the next ones."""
+    monkeypatch.setattr(tool, "router", FakeRouter(*(ZoomSelection(number=25) for _ in range(3))))
+    semdesk.click_object("the button", "single")
+    assert semdesk.task.messages[-1] == "Final debug img"
+    assert semdesk.task.messages[-2].startswith("Clicking coordinates")
+
+
+def test_repeated_click_asks_the_model_again(semdesk, monkeypatch, tmp_path):
+    """A cached answer isn't replayed for the same screen twice within a task."""
+    monkeypatch.setenv("MAX_DEPTH", "1")
+    semdesk._cache = ResponseCache(str(tmp_path / "cache.db"))
+    router = FakeRouter(ZoomSelection(number=25), ZoomSelection(number=25))
+    monkeypatch.setattr(tool, "router", router)
+    semdesk.click_object("the button", "single")
+    semdesk.click_object("the button", "single")
+    assert router.calls == 2
+
+    # a later task on the same screen gets the cached answer
+    semdesk._asked.clear()
+    semdesk.click_object("the button", "single")
+    assert router.calls == 2
+
+
+def test_full_depth_zoom_is_not_an_early_exit(semdesk, monkeypatch, caplog):
+    """Reaching the last depth isn't logged as stopping early."""
+    monkeypatch.setattr(tool, "router", FakeRouter(*(ZoomSelection(number=25) for _ in range(3))))
+    semdesk.click_object("the button", "single")
+    assert "stopping zoom early" not in caplog.text